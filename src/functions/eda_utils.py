@@ -2,10 +2,182 @@ import pandas as pd
 import numpy as np
 import scipy.stats as stats
 import matplotlib.pyplot as plt
+from matplotlib import cbook
 import seaborn as sns
 
+# Numba is optional, it is only used to speed up the per-group reductions
+try:
+    from numba import njit, prange, get_num_threads
+except ImportError:
+    njit = None
+
+# Default groupby options: only iterate over the categories actually present and skip sorting the group keys
+_GB_KW = dict(observed=True, sort=False)
+
+# Largest correlation matrix whose cells are annotated with their coefficient
+_MAX_ANNOTATED_FEATURES = 20
+
+# Smallest number of rows for which the group sums use the Numba kernel, below it np.bincount is as fast and
+# the kernel is not worth compiling
+_MIN_NUMBA_ROWS = 1_000_000
+
+# Check that a DataFrame marked by prepare_eda is still sorted by the splitter
+def _is_sorted_by(splitter, df):
+    """
+    This function checks whether the sorted-keys fast path can be used for the splitter.
+    The df.attrs mark set by prepare_eda is carried over by pandas through operations that reorder the rows
+    (sort_values, sample, concat, ...), so the mark is confirmed by checking that the splitter is still monotonic,
+    with any missing values at the end.
+
+    Parameters:
+    -----------
+    splitter : str
+        The column name used to split the data into groups.
+
+    df : pandas.DataFrame
+       The DataFrame containing the data to be analyzed.
+
+    Returns:
+    --------
+    bool
+        True if the DataFrame is marked as sorted by the splitter and actually is, False otherwise.
+
+    """
+    if df.attrs.get('sorted_by') != splitter:
+        return False
+
+    notna = df[splitter].notna().to_numpy()
+    n_valid = notna.sum()
+
+    return n_valid > 0 and notna[:n_valid].all() and df[splitter].iloc[:n_valid].is_monotonic_increasing
+
+
+# Group boundaries of a DataFrame sorted by the splitter
+def _sorted_bounds(splitter, df):
+    """
+    This function finds the groups of a DataFrame that has been sorted by the splitter with prepare_eda.
+    Since every group is a contiguous block of rows, the groups are found with a linear scan for the positions
+    where the key changes, without building a hash table.
+
+    Parameters:
+    -----------
+    splitter : str
+        The column name the DataFrame is sorted by.
+
+    df : pandas.DataFrame
+       The DataFrame returned by prepare_eda.
+
+    Returns:
+    --------
+    tuple
+        An array with the group labels and an array with the start position of each group followed by the end of the last one.
+
+    """
+    # Missing values are sorted last and are left out, as groupby does
+    keys = df[splitter].to_numpy()[:df[splitter].notna().sum()]
+    if len(keys) == 0:
+        return keys, np.zeros(1, dtype=np.intp)
+
+    starts = np.flatnonzero(keys[1:] != keys[:-1]) + 1
+    bounds = np.concatenate(([0], starts, [len(keys)]))
+
+    return keys[bounds[:-1]], bounds
+
+
+# Split a feature into one array per group
+def _split_groups(splitter, feature, df):
+    """
+    This function splits the values of a feature into groups defined by the splitter.
+    The group row positions are computed once with groupby().indices and taken from the raw feature array,
+    avoiding one boolean mask over the whole DataFrame per group.
+    The values keep their original dtype, since the SciPy tests fed by these groups cast them to float64 themselves.
+    If the DataFrame was sorted by the splitter with prepare_eda, the feature array is simply cut at the group boundaries.
+
+    Parameters:
+    -----------
+    splitter : str
+        The column name used to split the data into groups.
+
+    feature : str
+        The name of the feature/column whose values are split.
+
+    df : pandas.DataFrame
+       The DataFrame containing the data to be analyzed.
+
+    Returns:
+    --------
+    tuple
+        A list with the group labels and a list with the 1-D numpy array of feature values for each group.
+
+    """
+    vals = df[feature].to_numpy(copy=False)
+
+    if _is_sorted_by(splitter, df):
+        labels, bounds = _sorted_bounds(splitter, df)
+        return list(labels), np.split(vals[:bounds[-1]], bounds[1:-1])
+
+    idx_map = df.groupby(splitter, **_GB_KW).indices
+
+    return list(idx_map), [vals.take(idx) for idx in idx_map.values()]
+
+
+# Shapiro-Wilk test over several groups at once
+def _shapiro_groups(groups):
+    """
+    This function performs the Shapiro-Wilk test on every array contained in 'groups'.
+    When all groups have the same size they are stacked into a 2-D array and tested in a single call along axis 1,
+    otherwise each group is tested on its own.
+
+    Parameters:
+    -----------
+    groups : list
+        List of 1-D numpy arrays, one per group.
+
+    Returns:
+    --------
+    list
+        List of (statistic, p-value) tuples, in the same order as 'groups'.
+
+    """
+    if len({len(g) for g in groups}) == 1:
+        statistics, p_values = stats.shapiro(np.stack(groups), axis=1)
+        return list(zip(statistics, p_values))
+
+    return [tuple(stats.shapiro(g)) for g in groups]
+
+
+# Prepare a DataFrame for repeated EDA on the same category
+def prepare_eda(df, splitter):
+    """
+    This function sorts the DataFrame by the splitter so that every group is a contiguous block of rows, and marks it
+    through df.attrs['sorted_by'].
+    normality_check, kruskal and plot_percentage(s) detect the mark and find the groups with a linear scan instead of
+    hashing the splitter on every call, so the one-time sort pays off when they are run several times on the same data.
+    The mark is only trusted while the rows are still sorted by the splitter, otherwise the usual grouping is used.
+    Groups are then reported in sorted order. Call it again after modifying the splitter column.
+
+    Parameters:
+    -----------
+    df : pandas.DataFrame
+       The DataFrame containing the data to be analyzed.
+
+    splitter : str
+        The column name used to split the data into groups in the following analysis.
+
+    Returns:
+    --------
+    pandas.DataFrame
+        A sorted copy of the DataFrame, with a new default index.
+
+    """
+    df = df.sort_values(splitter, kind='stable', ignore_index=True)
+    df.attrs['sorted_by'] = splitter
+
+    return df
+
+
 # Check the normality of a feature's ditribution across different categories using the Shapiro-Wilk test and Q-Q plots
-def normality_check(ver_plots, hor_plots, splitter, feature, df):
+def normality_check(ver_plots, hor_plots, splitter, feature, df, axes=None):
     """
     This function creates subplots to display Q-Q plots for each category defined by the 'splitter' variable.
     It also prints the results of the Shapiro-Wilk test for each category.
@@ -27,27 +199,40 @@ def normality_check(ver_plots, hor_plots, splitter, feature, df):
     df : pandas.DataFrame
        The DataFrame containing the data to be analyzed.
 
+    axes : array of matplotlib.axes.Axes, optional
+        Pre-allocated axes to draw the Q-Q plots on, allowing a caller to reuse the same figure across calls.
+        They are cleared before drawing, and the caller is responsible for displaying the figure.
+        If None (default), a new ver_plots x hor_plots figure is created and displayed.
+
     Returns:
     --------
     None
         The function does not return any values. It prints the results of the Shapiro-Wilk test and displays the Q-Q plots.
 
     """
-    # Creating the subplots
-    fig, axes = plt.subplots(ver_plots, hor_plots, figsize=(10, ver_plots * 3))
-    axes = axes.flatten() if isinstance(axes, np.ndarray) else [axes]
+    # Creating the subplots, unless the caller provides them
+    show = axes is None
+    if show:
+        fig, axes = plt.subplots(ver_plots, hor_plots, figsize=(10, ver_plots * 3))
+    axes = axes.flatten() if isinstance(axes, np.ndarray) else np.atleast_1d(axes)
     
-    for i, split in enumerate(df[splitter].unique()):
-        # Shapiro-Wilk Test
-        shapiro_test = stats.shapiro(df[df[splitter] == split][feature])
+    # Feature values of each group, computed in a single pass over the data
+    splits, groups = _split_groups(splitter, feature, df)
+
+    # Shapiro-Wilk Test
+    shapiro_tests = _shapiro_groups(groups)
+
+    for i, (split, vals, shapiro_test) in enumerate(zip(splits, groups, shapiro_tests)):
         print(f"Shapiro-Wilk Test for {feature} for {split}: Statistic={shapiro_test[0]:.3f}, p-value={shapiro_test[1]:.3f}")
         
         # Q-Q Plots
-        stats.probplot(df[df[splitter] == split][feature], dist="norm", plot=axes[i])
+        axes[i].clear()
+        stats.probplot(vals, dist="norm", plot=axes[i])
         axes[i].set_title(f'Q-Q plot for {split}')
     
-    plt.tight_layout()
-    plt.show()
+    if show:
+        plt.tight_layout()
+        plt.show()
 
 
 
@@ -74,14 +259,14 @@ def kruskal(splitter, feature, df):
 
     """
     # Extract feature values for each group
-    overall_ratings = [df[df[splitter] == split][feature] for split in df[splitter].unique()]
+    _, overall_ratings = _split_groups(splitter, feature, df)
 
     # Perform Kruskal-Wallis H Test
     kruskal_stat, kruskal_p = stats.kruskal(*overall_ratings)
     print(f"Kruskal-Wallis Test Results:\nStatistic={kruskal_stat:.3f}, p-value={kruskal_p:.3f}")
 
 
-def correlation_coef(feature_a, feature_b, df):
+def correlation_coef(feature_a, feature_b, df, backend='numpy'):
     """
     This function calculates Pearson's correlation coefficient between two features.
 
@@ -93,22 +278,203 @@ def correlation_coef(feature_a, feature_b, df):
     df : pandas.DataFrame
        The DataFrame containing the data to be analyzed.
 
+    backend : str
+        'numpy' (default) computes the coefficient directly on the raw arrays.
+        'pingouin' uses pingouin.corr and also prints its p-value and confidence interval (requires pingouin).
+
     Returns:
     --------
     None
         The function does not return any values. It prints Pearson's correlation coefficient for the specified features.
 
     """
-    # Calculating the correlation coefficient
-    correlation = df[[feature_a, feature_b]].corr().iloc[0, 1]
+    if backend == 'pingouin':
+        import pingouin as pg
+
+        print(f"Correlation between '{feature_a}' and '{feature_b}':")
+        print(pg.corr(df[feature_a], df[feature_b]))
+        return
+
+    if backend != 'numpy':
+        raise ValueError(f"Unknown backend '{backend}', expected 'numpy' or 'pingouin'")
+
+    # Calculating the correlation coefficient directly on the raw arrays, the dot product and moments run in float32
+    a_arr = df[feature_a].to_numpy(np.float32)
+    b_arr = df[feature_b].to_numpy(np.float32)
+
+    # Dropping the pairs with a missing value, as DataFrame.corr does
+    complete = ~(np.isnan(a_arr) | np.isnan(b_arr))
+    a_arr, b_arr = a_arr[complete], b_arr[complete]
+    correlation = np.dot(a_arr - a_arr.mean(), b_arr - b_arr.mean()) / (a_arr.std() * b_arr.std() * len(a_arr))
     print(f"Correlation between '{feature_a}' and '{feature_b}': {correlation:.3f}")
 
 
+# Sum of every group in a single pass
+if njit is not None:
+    @njit(parallel=True, fastmath=True, cache=True)
+    def _group_sums(codes, vals, k, n_chunks):
+        """
+        This function accumulates the sum of the values of every group in one pass over the data.
+        Each of the n_chunks threads reduces its own chunk of rows into a separate row of partial sums, which are added
+        at the end. The rows are padded by a cache line so that threads do not write to the same line.
+
+        Parameters:
+        -----------
+        codes : numpy.ndarray
+            Integer group code (0 to k-1) of every row.
+
+        vals : numpy.ndarray
+            Feature value of every row.
+
+        k : int
+            The number of groups.
+
+        n_chunks : int
+            The number of chunks the rows are split into, normally numba.get_num_threads().
+
+        Returns:
+        --------
+        numpy.ndarray
+            The sum of the values of each group, as an array of length k.
+
+        """
+        chunk = (codes.size + n_chunks - 1) // n_chunks
+        s = np.zeros((n_chunks, k + 8))
+        for t in prange(n_chunks):
+            for i in range(t * chunk, min((t + 1) * chunk, codes.size)):
+                s[t, codes[i]] += vals[i]
+        return s[:, :k].sum(axis=0)
+else:
+    _group_sums = None
+
+
+# Percentage of several features within each group
+def _group_percentage(splitter, features, df):
+    """
+    This function calculates the mean of the specified features within each group defined by the splitter, as a percentage.
+    It works on the integer codes of the splitter, obtained with pd.factorize, with np.bincount reductions instead of a
+    pandas groupby. On large data the sums use a Numba kernel when numba is installed.
+    The codes and the group sizes are computed once and shared by all the features, the sizes are only recounted for
+    features with missing values, which are left out as in mean().
+    If the DataFrame was sorted by the splitter with prepare_eda, the sums are taken over the contiguous blocks instead.
+    Rows with a missing splitter value are ignored.
+
+    Parameters:
+    -----------
+    splitter : str
+        The column name used to split the data into groups.
+
+    features : list
+        List containing the names of the features for which the percentages are calculated.
+
+    df : pandas.DataFrame
+       The DataFrame containing the data to be analyzed.
+
+    Returns:
+    --------
+    pandas.DataFrame
+        The percentage of every feature (columns) for each group (index).
+
+    """
+    if _is_sorted_by(splitter, df):
+        labels, bounds = _sorted_bounds(splitter, df)
+        percent = {}
+        for feature in features:
+            vals = df[feature].to_numpy(np.float64)[:bounds[-1]]
+
+            # Missing feature values are left out of both the sums and the counts, as mean() does
+            valid = ~np.isnan(vals)
+            num = np.add.reduceat(np.where(valid, vals, 0), bounds[:-1], dtype=np.float64)
+            den = np.add.reduceat(valid, bounds[:-1], dtype=np.intp)
+            with np.errstate(invalid='ignore'):
+                percent[feature] = num / den * 100
+
+        return pd.DataFrame(percent, index=labels)
+
+    # Only the values that actually appear in the data are given a code
+    codes, cats = pd.factorize(df[splitter], sort=False)
+
+    # Missing splitter values are coded as -1
+    present = codes >= 0
+    codes = codes[present]
+
+    n_cats = len(cats)
+    den = np.bincount(codes, minlength=n_cats)
+
+    percent = {}
+    for feature in features:
+        vals = df[feature].to_numpy(np.float64)[present]
+
+        # Missing feature values are left out of both the sums and the counts, as mean() does
+        valid = ~np.isnan(vals)
+        if valid.all():
+            f_codes, f_den = codes, den
+        else:
+            vals, f_codes = vals[valid], codes[valid]
+            f_den = np.bincount(f_codes, minlength=n_cats)
+
+        if _group_sums is not None and len(f_codes) >= _MIN_NUMBA_ROWS:
+            num = _group_sums(f_codes, vals, n_cats, get_num_threads())
+        else:
+            num = np.bincount(f_codes, weights=vals, minlength=n_cats)
+        with np.errstate(invalid='ignore'):
+            percent[feature] = num / f_den * 100
+
+    return pd.DataFrame(percent, index=cats)
+
+
+def plot_percentages(splitter, features, df, colour = 'skyblue'):
+    """
+    This function creates, for every specified feature, a bar chart where every bar represents the percentage of the feature
+    within each value of a category defined by the splitter.
+    The percentages of all the features are computed together, so the splitter is only processed once.
+    It allows to specify a determined colour list.
+
+    Parameters:
+    -----------
+    splitter : str
+        The column name used to split the data into groups. Percentages are displayed for each unique value in this column.
+    
+    features : list
+        List containing the names of the features for which the percentages are calculated.
+    
+    df : pandas.DataFrame
+       The DataFrame containing the data to be analyzed.
+
+    colour : list
+        The list of colours generated from a colour map (dictionary).
+
+    Returns:
+    --------
+    None
+        The function does not return any values. It dislays the percentage bar charts.
+
+    """
+    # Calculating percentage of every feature's reviews by a certain 'splitter'
+    agg_df = _group_percentage(splitter, features, df)
+
+    for feature in features:
+        percent = agg_df[feature].sort_values(ascending=False)
+
+        # Plotting the percentage
+        fig, ax = plt.subplots(figsize=(8, 6))
+        percent.plot(kind='bar', ax=ax, color=colour)
+        ax.set_title(f"Percentage of {feature} Reviews by {splitter}")
+        ax.set_xlabel(splitter)
+        ax.set_ylabel(f'Percentage of {feature} Reviews')
+
+        # Add percentage labels on top of each bar
+        ax.bar_label(ax.containers[0], fmt='%.1f%%', padding=2)
+
+        plt.show()
+
+
 def plot_percentage(splitter, feature, df, colour = 'skyblue'):
     """
     This function creates a bar chart where every bar represents the percentage of a specific feature within each value of 
     a category defined by the splitter.
     It allows to specify a determined colour list.
+    It is equivalent to calling plot_percentages with a single feature.
 
     Parameters:
     -----------
@@ -130,22 +496,7 @@ def plot_percentage(splitter, feature, df, colour = 'skyblue'):
         The function does not return any values. It dislays the percentage bar charts.
 
     """
-    # Calculating percentage of 'feature' reviews by a certain 'splitter'
-    percent = (df.groupby(splitter)[feature].mean()*100).sort_values(ascending=False)
-
-    # Plotting the percentage
-    fig, ax = plt.subplots(figsize=(8, 6))
-    bars = percent.plot(kind='bar', ax=ax, color=colour)
-    ax.set_title(f"Percentage of {feature} Reviews by {splitter}")
-    ax.set_xlabel(splitter)
-    ax.set_ylabel(f'Percentage of {feature} Reviews')
-
-    # Add percentage labels on top of each bar
-    for bar in bars.patches:
-        height = bar.get_height()
-        ax.text(bar.get_x() + bar.get_width() / 2, height, f'{height:.1f}%', ha='center', va='bottom')
-
-    plt.show()
+    plot_percentages(splitter, [feature], df, colour)
 
 
 def correlation_matrix(features, df):
@@ -166,12 +517,28 @@ def correlation_matrix(features, df):
         The function does not return any values. It dislays the correlation matrix.
 
     """
-    # Obtaining correlation coefficients of specific features
-    correlation_matrix = df[features+['Recommended']].corr()
+    # Obtaining correlation coefficients of specific features from a contiguous block
+    columns = features + ['Recommended']
+    X = df[columns].to_numpy(np.float64)
+    if len(X) < 2 or np.isnan(X).any():
+        # np.corrcoef has no pairwise deletion of missing values and warns on too few rows, DataFrame.corr handles both
+        coefficients = df[columns].corr().to_numpy()
+    else:
+        coefficients = np.corrcoef(X, rowvar=False)
+
+    # Plotting the heatmap as a single image instead of one rectangle per cell
+    fig, ax = plt.subplots(figsize=(8, 6))
+    im = ax.imshow(coefficients, cmap='coolwarm', vmin=-1, vmax=1)
+    ax.grid(False)
+    ax.set_xticks(range(len(columns)), columns, rotation=45, ha='right')
+    ax.set_yticks(range(len(columns)), columns)
+    plt.colorbar(im, ax=ax)
+
+    # Annotating the coefficients only while the cells are big enough to be read
+    if len(columns) <= _MAX_ANNOTATED_FEATURES:
+        for (row, col), r in np.ndenumerate(coefficients):
+            ax.text(col, row, f'{r:.2f}', ha='center', va='center', color='white' if abs(r) > 0.6 else 'black')
 
-    # Plotting the heatmap
-    plt.figure(figsize=(8, 6))
-    sns.heatmap(correlation_matrix, annot=True, cmap='coolwarm', fmt='.2f')
     plt.title('Correlation Matrix of Rating Aspects')
     plt.show()
 
@@ -199,9 +566,16 @@ def plot_combined_boxplot(split, features, df):
         The function does not return any values. It dislays the Box plots of the specified features.
 
     """
+    # Box statistics of every feature, ignoring missing values. Whiskers extend to the furthest values within 1.5 IQR
+    # of the box and the rest are drawn as outliers, as in seaborn. Empty features get an empty box
+    X = df[features].to_numpy(np.float64)
+    stats_list = cbook.boxplot_stats([col[~np.isnan(col)] for col in X.T], labels=features)
+
     # Plotting the Box Plots
-    plt.figure(figsize=(12, 6))
-    sns.boxplot(data=df[features])
+    fig, ax = plt.subplots(figsize=(12, 6))
+    boxes = ax.bxp(stats_list, patch_artist=True, medianprops={'color': 'black'})
+    for patch, colour in zip(boxes['boxes'], sns.color_palette(n_colors=len(features))):
+        patch.set_facecolor(colour)
     plt.title(f'Box Plot of Numerical Features for {split}')
     plt.xlabel('Features')
     plt.ylabel('Ratings')
@@ -239,6 +613,59 @@ def eda(splitter, split, features, df):
     # Extracting the subset
     df_eda = df[df[splitter]==split]
 
+    _eda_subset(split, features, df_eda)
+
+
+# Function to perform the same EDA for every group of a category
+def eda_all(splitter, features, df):
+    """
+    This function performs the EDA of the eda function for every group within a specific category (splitter).
+    The subsets are obtained from a single groupby instead of extracting each one with its own boolean mask.
+
+    Parameters:
+    -----------
+    splitter : str
+        The name of the column that is being analyzed. The EDA is performed for each unique value in this column.
+    
+    features : list
+        List containing the names of the features for which the EDA is performed.
+
+    df : pandas.DataFrame
+       The DataFrame containing the data to be analyzed.
+
+    Returns:
+    --------
+    None
+        The function does not return any values. It dislays the descriptive statistics, Box plots, and
+        correlation matrix of the specified features for every group.
+
+    """
+    for split, df_eda in df.groupby(splitter, **_GB_KW):
+        _eda_subset(split, features, df_eda)
+
+
+def _eda_subset(split, features, df_eda):
+    """
+    This function displays the descriptive statistics, Box plots, and correlation matrix of the specified features
+    for an already extracted subset. It is shared by the eda and eda_all functions.
+
+    Parameters:
+    -----------
+    split : str
+        The specific group that is being analyzed.
+
+    features : list
+        List containing the names of the features for which the EDA is performed.
+
+    df_eda : pandas.DataFrame
+       The subset of the data for the specific group.
+
+    Returns:
+    --------
+    None
+        The function does not return any values.
+
+    """
     # Displaying descriptive statistics
     print(df_eda[features].describe())
 
@@ -270,13 +697,16 @@ def traveller_type(split, df):
         The function does not return any values. It dislays the descriptive statistics, pie chart, and percentages bar chart.
 
     """
+    # Grouping once by type of traveller and reusing it for every aggregation below
+    gb = df.groupby('Type of Traveller', **_GB_KW)
+
     # Summary statistics for Overall Rating depending on the type of Traveller
-    summary_stats = df.groupby('Type of Traveller')['Overall Rating'].describe()
+    summary_stats = gb['Overall Rating'].describe().sort_index()
     print(f'Descriptive statistics of Type of traveller in {split}')
     print('\n',summary_stats)
     
     # Calculate the percentage of each type of traveller
-    traveller_counts = df['Type of Traveller'].value_counts()
+    traveller_counts = gb.size().sort_values(ascending=False)
     traveller_percentages = traveller_counts / traveller_counts.sum() * 100
 
     # Define a color map
@@ -294,7 +724,7 @@ def traveller_type(split, df):
     colors = [color_map[traveller] for traveller in traveller_types]
 
     # Traveler types for percentage bar chart
-    type_percent = (df.groupby('Type of Traveller')['Recommended'].mean() * 100).sort_values(ascending=False)
+    type_percent = (gb['Recommended'].mean() * 100).sort_values(ascending=False)
     
     # Generate the color list for the bar chart
     colors2 = [color_map.get(traveller) for traveller in type_percent.index]